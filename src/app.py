@@ -1,32 +1,81 @@
 import artc
+import control_loop
 import iot
-import time
+import os
+import signal
+import sys
+import telemetry
 
-control = artc.ARTC()
-bmp280  = iot.BMP280Monitor()
-dht11 = iot.DHT11Monitor()
+# Usa a avaliação esparsa das regras e o cache da definição do controlador, que evitam
+# construir o sistema do skfuzzy a cada reinicialização, e guarda as potências das leituras
+# recentes (arredondadas em 2 casas, como as medições) para não recalcular as repetidas
+control = artc.ARTC(sparse = True, definition_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'artc-definition.npz'),
+                    cache_size = 1024, cache_step = 0.01)
 
-while True:
+# Os sensores são lidos em segundo plano; o laço só consulta as leituras mais recentes
+acquisition = iot.room_acquisition(iot.DHT11Monitor(), iot.BMP280Monitor(), dht11_interval = 5.0, bmp280_interval = 5.0)
+acquisition.start()
 
-    # Obtém a temperatura, pressão e umidade
-    humidity, temperature1 = dht11.get_humidity_and_temperature()
-    temperature2 = round(bmp280.get_temperature(), 2)
-    pressure = round(bmp280.get_pressure(), 2)
+# Sem uma primeira leitura válida de cada sensor em 2 minutos o serviço termina com erro,
+# em vez de ficar parado sem exibir nada
+if not acquisition.wait(timeout = 120.0):
+    missing = [name for name in ('dht11', 'bmp280') if acquisition.latest(name) is None]
+    acquisition.stop(timeout = 1.0)
+    sys.exit("No valid reading from {} after 120 s; check the sensor wiring".format(', '.join(missing)))
 
-    # Usa por padrão a temperatura do DHT11, caso não consiga, usa do BMP280
-    temperature = round((temperature2 if temperature1 is None else temperature1), 2)
+# Registro binário de cada ciclo calculado, gravado ao lado do app.py em lotes ou, no máximo,
+# a cada 10 minutos
+log = telemetry.TelemetryWriter(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'telemetry'), flush_interval = 600.0)
+
+def read_room():
+
+    # Usa a temperatura do DHT11 enquanto ela tiver até 60 segundos, senão a do BMP280; a umidade
+    # vale por até 10 minutos e a pressão por até 60 segundos. As leituras brutas seguem junto
+    # para o registro de telemetria
+    return iot.read_room(acquisition, dht11_max_age = 60.0, humidity_max_age = 600.0, bmp280_max_age = 60.0)
+
+def warn(error):
+
+    # Leituras velhas demais: as saídas não são recalculadas até os sensores voltarem
+    print ("Sensor error:    {}".format(error), file = sys.stderr)
+
+def show(reading, control, sample):
+    temperature, pressure, humidity = reading
+
+    # Registra o ciclo na telemetria
+    log.append(sample, control.heater_potency, control.chiller_potency)
 
     # Exibe as medições na tela
     print ("Temperature:     {:.2f} *C".format(temperature))
     print ("Pressure:        {:.2f} hPa".format(pressure))
     print ("Humidity:        {:.2f} %".format(humidity))
 
-    # Computa a simulação para definir a intensidade do aquecedor e refrigerador
-    control.compute_simulation(temperature, pressure, humidity)
-
     # Exibe os resultados na tela
     print ("Chiller Potency: {:.0f} %".format(control.chiller_potency))
-    print ("Heater Potency:  {:.0f} %".format(control.heater_potency), end = '\n\n')
+    print ("Heater Potency:  {:.0f} %".format(control.heater_potency))
+
+    # Exibe quantos cálculos foram evitados e a latência desde a leitura
+    stats = loop.stats()
+    print ("Skipped:         {} of {}".format(stats['skipped'], stats['skipped'] + stats['computed']))
+    print ("Latency:         {:.2f} s".format(stats['latency_last']), end = '\n\n')
+
+    # Com ARTC_PROFILE=1 exibe também o tempo de cada etapa do laço
+    if timer is not None:
+        for stage, summary in timer.summary().items():
+            print ("{:<16} p50 {:.0f} us  p99 {:.0f} us".format(stage + ':', summary['p50'] * 1e6, summary['p99'] * 1e6))
+        print ()
+
+# Medição opcional do tempo de cada etapa (aquisição, inferência e atuação)
+timer = control_loop.StageTimer() if os.environ.get('ARTC_PROFILE') == '1' else None
+
+# Recalcula as saídas quando alguma leitura sai da zona morta ou a cada 5 minutos,
+# consultando os sensores entre 5 e 30 segundos conforme as leituras mudam
+loop = control_loop.ControlLoop(control, read_room, show, min_interval = 5.0, max_interval = 30.0, max_staleness = 300.0,
+                                timer = timer, on_error = warn)
 
-    # Espera 30 segundos para continuar atualizando as medidas
-    time.sleep(30)
\ No newline at end of file
+# O SIGTERM (systemctl stop, kill) vira um SystemExit, para que o finally grave o lote pendente
+signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+try:
+    loop.run()
+finally:
+    log.close()
@@ -1,11 +1,50 @@
+import os
+import hashlib
+import itertools
+import warnings
 import numpy as np
-import matplotlib.pyplot as plt
-import skfuzzy as fuzz
-from skfuzzy import control
+from lut import LookupTable, grid_axis
+from rules import RuleIndex
+from cache import QuantizedCache
 
 # Automated Room Temperature Control (ARTC)
 class ARTC:
-    def __init__(self):
+    def __init__(self, compiled = False, max_error = 1.0, table_path = None, sparse = False, definition_path = None,
+                 cache_size = 0, cache_step = 0.01):
+
+        # O sistema do skfuzzy é caro de construir (principalmente o grafo do ControlSystem),
+        # então ele só é criado quando algum caminho que depende dele for usado
+        self._weather_control = None
+
+        # Definição do controlador em arrays (universos, funções de pertinência e tabela de regras),
+        # carregada do cache quando ele foi gerado por esta mesma versão do código
+        if not self._load_definition(definition_path):
+            self._build_fuzzy_system()
+            self._build_rule_table()
+            if definition_path is not None:
+                self._save_definition(definition_path)
+
+        # No modo esparso apenas as regras que podem ser ativadas pela leitura são avaliadas; o modo
+        # compilado também usa esse índice para as leituras fora da região coberta pela tabela
+        self._rule_index = RuleIndex(
+            self._input_universes,
+            self._input_breakpoints,
+            self._rule_table,
+            self._output_universes,
+            self._output_mfs) if sparse or compiled else None
+
+        # No modo compilado as saídas vêm de uma tabela pré-calculada, carregada do disco quando possível
+        self._table = self._load_or_build_table(max_error, table_path) if compiled else None
+
+        # Cache opcional das potências, indexado pelas entradas arredondadas para múltiplos de cache_step
+        # (um passo para todas as entradas ou uma tupla com um passo por entrada)
+        self._cache = QuantizedCache(cache_size, cache_step) if cache_size > 0 else None
+
+    def _build_fuzzy_system(self):
+
+        # Importa o skfuzzy apenas quando o sistema é construído
+        import skfuzzy as fuzz
+        from skfuzzy import control
 
         # Universo das funções de entrada
         temp_universe     = np.arange(-30.0, 60.0, 0.5)      # Temperatura, em Celsius
@@ -17,24 +56,38 @@ class ARTC:
         self._pressure    = control.Antecedent(pressure_universe, 'Pressure')
         self._humidity    = control.Antecedent(humidity_universe, 'Humidity')
 
-        # Funções para temperatura
-        self._temperature['Freezy'] = fuzz.trapmf(self._temperature.universe, [-30.0, -30.0, -3.0, 0.0])
-        self._temperature['Cold']   = fuzz.trapmf(self._temperature.universe, [-3.0, 0.0, 13.0, 16.0])
-        self._temperature['Normal'] = fuzz.trapmf(self._temperature.universe, [13.0, 16.0, 27.0, 30.0])
-        self._temperature['Warm']   = fuzz.trapmf(self._temperature.universe, [27.0, 30.0, 33.0, 36.0])
-        self._temperature['Hot']    = fuzz.trapmf(self._temperature.universe, [33.0, 40.0, 47.0, 54.0])
-
-        # Funções para pressão
-        self._pressure['Fall']     = fuzz.trapmf(self._pressure.universe, [500.0, 500.0, 680.0, 700.0])
-        self._pressure['Low']      = fuzz.trapmf(self._pressure.universe, [680.0, 700.0, 880.0, 900.0])
-        self._pressure['Amicable'] = fuzz.trapmf(self._pressure.universe, [880.0, 900.0, 1080.0, 1100.0])
-        self._pressure['Elevated'] = fuzz.trapmf(self._pressure.universe, [1080.0, 1100.0, 1280.0, 1300.0])
-        self._pressure['High']     = fuzz.trapmf(self._pressure.universe, [1280.0, 1300.0, 1500.0, 1500.0])
-
-        # Funções para umidade
-        self._humidity['Dry']         = fuzz.trapmf(self._humidity.universe, [0.0, 0.0, 25.0, 30.0])
-        self._humidity['Comfortable'] = fuzz.trapmf(self._humidity.universe, [25.0, 30.0, 55.0, 60.0])
-        self._humidity['Wet']         = fuzz.trapmf(self._humidity.universe, [55.0, 60.0, 100.0, 100.0])
+        # Pontos (a, b, c, d) das funções trapezoidais de cada entrada
+        self._breakpoints = {
+
+            # Funções para temperatura
+            'Temperature': {
+                'Freezy': [-30.0, -30.0, -3.0, 0.0],
+                'Cold':   [-3.0, 0.0, 13.0, 16.0],
+                'Normal': [13.0, 16.0, 27.0, 30.0],
+                'Warm':   [27.0, 30.0, 33.0, 36.0],
+                'Hot':    [33.0, 40.0, 47.0, 54.0],
+            },
+
+            # Funções para pressão
+            'Pressure': {
+                'Fall':     [500.0, 500.0, 680.0, 700.0],
+                'Low':      [680.0, 700.0, 880.0, 900.0],
+                'Amicable': [880.0, 900.0, 1080.0, 1100.0],
+                'Elevated': [1080.0, 1100.0, 1280.0, 1300.0],
+                'High':     [1280.0, 1300.0, 1500.0, 1500.0],
+            },
+
+            # Funções para umidade
+            'Humidity': {
+                'Dry':         [0.0, 0.0, 25.0, 30.0],
+                'Comfortable': [25.0, 30.0, 55.0, 60.0],
+                'Wet':         [55.0, 60.0, 100.0, 100.0],
+            },
+        }
+
+        for variable in (self._temperature, self._pressure, self._humidity):
+            for label, abcd in self._breakpoints[variable.label].items():
+                variable[label] = fuzz.trapmf(variable.universe, abcd)
 
         # Universo das funções de saída
         control_universe = np.arange(0.0, 1.0, 0.01)
@@ -150,22 +203,362 @@ class ARTC:
         # Criando a simulação
         self._simulation = control.ControlSystemSimulation(self._weather_control)
 
+    def _ensure_fuzzy_system(self):
+
+        # Constrói o sistema do skfuzzy na primeira vez em que ele é necessário
+        if self._weather_control is None:
+            self._build_fuzzy_system()
+
+    def _build_rule_table(self):
+
+        # Universos, funções de pertinência (uma linha por termo) e pontos dos trapézios de cada variável
+        inputs  = (self._temperature, self._pressure, self._humidity)
+        outputs = (self._heater, self._chiller)
+        self._input_universes    = [np.asarray(v.universe, dtype = np.float64) for v in inputs]
+        self._input_mfs          = [np.array([term.mf for term in v.terms.values()]) for v in inputs]
+        self._input_breakpoints  = [np.array([self._breakpoints[v.label][label] for label in v.terms]) for v in inputs]
+        self._output_universes   = [np.asarray(v.universe, dtype = np.float64) for v in outputs]
+        self._output_mfs         = [np.array([term.mf for term in v.terms.values()]) for v in outputs]
+
+        # Tabela de regras: para cada regra, o índice do termo usado em cada entrada e em cada saída
+        variables = inputs + outputs
+        indexes = [{label: i for i, label in enumerate(v.terms)} for v in variables]
+        rows = []
+        for rule in self._weather_control.rules:
+            terms = {term.parent.label: term.label for term in rule.antecedent_terms}
+            terms.update({weighted.term.parent.label: weighted.term.label for weighted in rule.consequent})
+            rows.append([index[terms[v.label]] for v, index in zip(variables, indexes)])
+        self._rule_table = np.array(rows, dtype = np.intp)
+
+    @staticmethod
+    def _source_version():
+
+        # Resumo do código deste módulo, onde a definição do controlador é escrita
+        with open(__file__, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+
+    def _definition_arrays(self):
+
+        # Arrays que compõem a definição do controlador, com nomes estáveis para o arquivo de cache
+        arrays = {'rule_table': self._rule_table}
+        for i, (universe, mfs, breakpoints) in enumerate(zip(self._input_universes, self._input_mfs, self._input_breakpoints)):
+            arrays['input{}_universe'.format(i)] = universe
+            arrays['input{}_mfs'.format(i)] = mfs
+            arrays['input{}_breakpoints'.format(i)] = breakpoints
+        for o, (universe, mfs) in enumerate(zip(self._output_universes, self._output_mfs)):
+            arrays['output{}_universe'.format(o)] = universe
+            arrays['output{}_mfs'.format(o)] = mfs
+        return arrays
+
+    def _save_definition(self, path):
+
+        # Salva a definição em um arquivo .npz compactado, junto com a versão do código que a gerou.
+        # O arquivo é escrito ao lado do definitivo e só então renomeado, para que uma queda de
+        # energia no meio da escrita não deixe um cache truncado
+        # O cache é opcional: se não puder ser gravado, o controlador continua com a definição em memória
+        temporary = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            with open(temporary, 'wb') as f:
+                np.savez_compressed(f, version = np.array(self._source_version()), **self._definition_arrays())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, path)
+        except OSError as error:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            warnings.warn("Could not save the controller definition to {}: {}".format(path, error))
+
+    def _load_definition(self, path):
+
+        # Carrega a definição salva, desde que ela tenha sido gerada por esta versão do código;
+        # um arquivo ilegível (corrompido, truncado ou sem algum array) é tratado como ausente
+        if path is None or not os.path.exists(path):
+            return False
+        try:
+            with np.load(path) as data:
+                if str(data['version']) != self._source_version():
+                    return False
+                rule_table = data['rule_table']
+                input_universes   = [data['input{}_universe'.format(i)] for i in range(3)]
+                input_mfs         = [data['input{}_mfs'.format(i)] for i in range(3)]
+                input_breakpoints = [data['input{}_breakpoints'.format(i)] for i in range(3)]
+                output_universes  = [data['output{}_universe'.format(o)] for o in range(2)]
+                output_mfs        = [data['output{}_mfs'.format(o)] for o in range(2)]
+        except Exception:
+            return False
+
+        self._rule_table = rule_table
+        self._input_universes, self._input_mfs, self._input_breakpoints = input_universes, input_mfs, input_breakpoints
+        self._output_universes, self._output_mfs = output_universes, output_mfs
+        return True
+
+    def _fingerprint(self):
+
+        # Resumo da definição do controlador (universos, funções de pertinência e regras),
+        # usado para saber se uma tabela salva ainda corresponde a este controlador
+        digest = hashlib.sha1()
+        for name, array in sorted(self._definition_arrays().items()):
+            digest.update(name.encode())
+            digest.update(np.ascontiguousarray(array, dtype = np.float64).tobytes())
+        return digest.hexdigest()
+
+    def _load_or_build_table(self, max_error, table_path, min_width = (0.5, 1.0, 0.5)):
+
+        # Reaproveita a tabela salva se ela foi gerada para esta mesma definição de controlador,
+        # com erro máximo igual ou menor que o pedido e com a mesma largura mínima de célula
+        fingerprint = self._fingerprint()
+        min_width = tuple(float(width) for width in min_width)
+        if table_path is not None and os.path.exists(table_path):
+            try:
+                table = LookupTable.load(table_path)
+            except Exception:
+
+                # Tabela ilegível (corrompida, truncada ou de outro formato): é gerada novamente
+                table = None
+            if (table is not None and table.fingerprint == fingerprint and table.max_error <= max_error
+                    and table.min_width == min_width):
+                return table
+
+        # Caso contrário, gera uma nova tabela e a salva para as próximas inicializações
+        table = self._build_table(max_error, fingerprint, min_width)
+        if table_path is not None:
+            try:
+                table.save(table_path)
+            except OSError as error:
+
+                # Sem o cache a tabela continua valendo em memória; só será gerada de novo na próxima inicialização
+                warnings.warn("Could not save the lookup table to {}: {}".format(table_path, error))
+        return table
+
+    def _build_table(self, max_error, fingerprint, min_width, max_points = 2000000):
+
+        # Grade inicial: vértices das funções de pertinência e pontos médios das transições
+        axes = [grid_axis(universe, mfs, 2) for universe, mfs in zip(self._input_universes, self._input_mfs)]
+
+        # Posições relativas, dentro de cada célula, dos 27 pontos onde a interpolação é conferida
+        offsets = np.array(np.meshgrid(*[(0.25, 0.5, 0.75)] * 3, indexing = 'ij')).reshape(3, -1)
+
+        # Valores já calculados em cada ponto da grade, células já conferidas e regiões (cantos
+        # inferior e superior) deixadas para as regras, para não refazer o trabalho a cada refinamento
+        computed, checked, exact = {}, set(), []
+
+        while True:
+
+            shape = tuple(len(axis) for axis in axes)
+            if np.prod(shape) > max_points:
+                raise ValueError("Lookup table needs more than {} points to reach max_error {:.2f} %".format(max_points, max_error))
+
+            # Calcula apenas os pontos da grade que ainda não foram calculados
+            grid = [g.ravel() for g in np.meshgrid(*axes, indexing = 'ij')]
+            missing = [i for i, key in enumerate(zip(*grid)) if key not in computed]
+            if missing:
+                values = self._infer_batch(*(g[missing] for g in grid))
+                for i, heater, chiller in zip(missing, *values):
+                    computed[(grid[0][i], grid[1][i], grid[2][i])] = (heater, chiller)
+            values = np.array([computed[key] for key in zip(*grid)]).T.reshape((2,) + shape)
+
+            # Células dentro das regiões deixadas para as regras
+            mask = np.zeros(tuple(n - 1 for n in shape), dtype = bool)
+            for low, high in exact:
+                mask[tuple(slice(np.searchsorted(axis, l), np.searchsorted(axis, h)) for axis, l, h in zip(axes, low, high))] = True
+            table = LookupTable(*axes, values[0], values[1], fingerprint, mask, max_error, min_width)
+
+            # Células que ainda não foram conferidas (as novas, criadas pelo último refinamento)
+            cells = np.argwhere(~mask)
+            low = np.array([axis[cells[:, a]] for a, axis in enumerate(axes)])
+            high = np.array([axis[cells[:, a] + 1] for a, axis in enumerate(axes)])
+            keys = [tuple(key) for key in np.concatenate((low, high)).T.tolist()]
+            new = np.array([key not in checked for key in keys], dtype = bool)
+            cells, low, high = cells[new], low[:, new], high[:, new]
+            keys = [key for key, n in zip(keys, new) if n]
+            if len(keys) == 0:
+                return table
+
+            # Erro da interpolação trilinear em cada ponto conferido, em pontos percentuais de potência
+            points = low[:, :, None] + (high - low)[:, :, None] * offsets[:, None, :]
+            expected = np.array(self._infer_batch(*points))
+            obtained = np.zeros_like(expected)
+            for corner in itertools.product((0, 1), repeat = 3):
+                weight = np.prod([o if c else 1.0 - o for o, c in zip(offsets, corner)], axis = 0)
+                obtained += values[:, cells[:, 0] + corner[0], cells[:, 1] + corner[1], cells[:, 2] + corner[2], None] * weight
+            error = np.max(np.abs(obtained - expected), axis = 0) * 100
+            bad = ~(np.max(error, axis = 1) <= max_error)
+            checked.update(key for key, b in zip(keys, bad) if not b)
+            if not bad.any():
+                return table
+
+            # No pior ponto de cada célula com erro excessivo, descobre em qual eixo a interpolação
+            # linear mais se afasta da inferência
+            worst_point = np.argmax(error[bad], axis = 1)
+            point = points[:, bad, :][:, np.arange(len(worst_point)), worst_point]
+            target = expected[:, bad, :][:, np.arange(len(worst_point)), worst_point]
+            low, high = low[:, bad], high[:, bad]
+            errors_1d = []
+            for a in range(3):
+                at_low, at_high = point.copy(), point.copy()
+                at_low[a], at_high[a] = low[a], high[a]
+                t = (point[a] - low[a]) / (high[a] - low[a])
+                linear = np.array(self._infer_batch(*at_low)) * (1.0 - t) + np.array(self._infer_batch(*at_high)) * t
+                errors_1d.append(np.max(np.abs(linear - target), axis = 0))
+            worst = np.argmax(errors_1d, axis = 0)
+
+            # Divide a célula ao meio nesse eixo; quando ela já é estreita demais, o salto está
+            # dentro dela e a região passa a ser avaliada pelas regras
+            narrow = (high - low)[worst, np.arange(len(worst))] <= np.array(min_width)[worst]
+            exact.extend((tuple(low[:, c]), tuple(high[:, c])) for c in np.flatnonzero(narrow))
+            for a in range(3):
+                split = ~narrow & (worst == a)
+                axes[a] = np.union1d(axes[a], (low[a, split] + high[a, split]) / 2.0)
+
     def compute_simulation(self, temperature, pressure, humidity):
-        
-        # Coloca as entradas para a simulação
-        self._simulation.input['Temperature'] = temperature
-        self._simulation.input['Pressure'] = pressure
-        self._simulation.input['Humidity'] = humidity
 
-        # Computa o resultado da simulação
-        self._simulation.compute()
+        if self._cache is not None:
+
+            # Leituras que se repetem após a quantização usam o resultado guardado; numa falta o cálculo
+            # usa a leitura original, para que o arredondamento nunca leve a leitura para fora da
+            # região onde as regras são ativadas (53.8 °C viraria 54.0 °C com passo de 0.5)
+            key = self._cache.quantize((temperature, pressure, humidity))
+            potency = self._cache.get(key)
+            if potency is None:
+                potency = self.compute_potency(temperature, pressure, humidity)
+                self._cache.put(key, potency)
+
+        else:
+            potency = self.compute_potency(temperature, pressure, humidity)
+
+        self.heater_potency, self.chiller_potency = potency
+
+    def cache_info(self):
+
+        # Contadores do cache (acertos, faltas e descartes), ou None se ele estiver desativado
+        return self._cache.info() if self._cache is not None else None
+
+    def is_reentrant(self):
+
+        # Nos modos esparso e compilado compute_potency não altera o estado do ARTC e pode ser
+        # chamada por várias threads ao mesmo tempo; no skfuzzy ela usa a simulação compartilhada
+        return self._rule_index is not None or self._table is not None
+
+    def compute_potency(self, temperature, pressure, humidity):
+
+        # Retorna as potências (aquecedor, refrigerador) em % sem alterar o estado do controlador;
+        # nos modos esparso e compilado pode ser chamada por várias threads ao mesmo tempo
+        potency = None
+        if self._table is not None:
+
+            # Consulta a tabela pré-calculada, que retorna None para leituras que ela não cobre
+            potency = self._table.lookup(temperature, pressure, humidity)
+
+        if potency is None and self._rule_index is not None:
+
+            # Avalia apenas as regras ativadas pela leitura
+            potency = self._rule_index.compute(temperature, pressure, humidity)
+
+        if potency is not None:
+            heater, chiller = potency
+
+        else:
+
+            # Coloca as entradas para a simulação
+            self._ensure_fuzzy_system()
+            self._simulation.input['Temperature'] = temperature
+            self._simulation.input['Pressure'] = pressure
+            self._simulation.input['Humidity'] = humidity
+
+            # Computa o resultado da simulação
+            self._simulation.compute()
+            heater, chiller = self._simulation.output['Heater'], self._simulation.output['Chiller']
+
+        # Resultado da simulação, em %
+        return round(heater, 2) * 100, round(chiller, 2) * 100
 
-        # Imprime o resultado da simulação
-        self.heater_potency = round(self._simulation.output['Heater'], 2) * 100
-        self.chiller_potency = round(self._simulation.output['Chiller'], 2) * 100
+    def compute_batch(self, temperature, pressure, humidity):
+
+        # Computa a simulação para arrays de leituras de uma só vez, com os mesmos resultados do skfuzzy
+        heater, chiller = self._infer_batch(temperature, pressure, humidity)
+
+        # Potências em %, arredondadas como em compute_simulation; NaN onde nenhuma regra foi ativada
+        return np.round(heater, 2) * 100, np.round(chiller, 2) * 100
+
+    @staticmethod
+    def _crossings(universe, mf, cut):
+
+        # Pontos onde a função de pertinência cruza o corte de cada leitura, calculados como no
+        # universo ampliado do skfuzzy (com corte nulo ele compara com > em vez de >=). As funções
+        # de saída são unimodais, então há no máximo dois cruzamentos: o da subida e o da descida
+        above = np.where(cut[:, None] == 0.0, mf > 0.0, mf >= cut[:, None])
+        change = above[:, 1:] != above[:, :-1]
+        found = np.any(change, axis = 1)
+        points = []
+        for idx in (np.argmax(change, axis = 1), change.shape[1] - 1 - np.argmax(change[:, ::-1], axis = 1)):
+            x1, x2, y1, y2 = universe[idx], universe[idx + 1], mf[idx], mf[idx + 1]
+            with np.errstate(invalid = 'ignore', divide = 'ignore'):
+                x = x1 + (cut - y1) * (x2 - x1) / (y2 - y1)
+
+            # Sem cruzamento o ponto repete o início do universo e forma um trecho de largura nula
+            points.append(np.where(found, x, universe[0]))
+        return np.array(points).T
+
+    @classmethod
+    def _defuzz_batch(cls, universe, mfs, cuts):
+
+        # Universo ampliado de cada leitura: pontos do universo mais os cruzamentos de cada termo
+        x = [np.broadcast_to(universe, (cuts.shape[1], len(universe)))]
+        x.extend(cls._crossings(universe, mf, cut) for cut, mf in zip(cuts, mfs))
+        x = np.sort(np.concatenate(x, axis = 1), axis = 1)
+
+        # Função de saída: máximo entre as funções de pertinência recortadas pela ativação
+        y = np.zeros_like(x)
+        for cut, mf in zip(cuts, mfs):
+            np.maximum(y, np.minimum(cut[:, None], np.interp(x, universe, mf)), out = y)
+
+        # Defuzzificação por centroide, considerando a função linear entre cada par de pontos
+        x1, x2, y1, y2 = x[:, :-1], x[:, 1:], y[:, :-1], y[:, 1:]
+        area = np.sum((x2 - x1) * (y1 + y2), axis = 1) / 2.0
+        moment = np.sum((x2 - x1) * (x1 * (2.0 * y1 + y2) + x2 * (y1 + 2.0 * y2)), axis = 1) / 6.0
+        with np.errstate(invalid = 'ignore', divide = 'ignore'):
+            return np.where(area > 0.0, moment / area, np.nan)
+
+    def _infer_batch(self, temperature, pressure, humidity, chunk_size = 4096):
+
+        # Entradas como arrays de mesmo tamanho
+        inputs = [np.asarray(x, dtype = np.float64) for x in (temperature, pressure, humidity)]
+        shape = inputs[0].shape
+        if any(x.shape != shape for x in inputs):
+            raise ValueError("temperature, pressure and humidity must have the same shape")
+        inputs = [x.ravel() for x in inputs]
+        outputs = [np.empty(inputs[0].size) for _ in self._output_universes]
+
+        # As leituras são processadas em blocos de chunk_size, para que a memória usada pelos
+        # arrays intermediários não cresça com o número de leituras
+        rules = self._rule_table
+        for start in range(0, inputs[0].size, chunk_size):
+            stop = start + chunk_size
+
+            # Pertinência de cada termo de entrada, com forma (termos, N), com as leituras
+            # limitadas aos universos como faz o skfuzzy
+            memberships = [np.array([np.interp(np.clip(x[start:stop], universe[0], universe[-1]), universe, mf) for mf in mfs])
+                           for x, universe, mfs in zip(inputs, self._input_universes, self._input_mfs)]
+
+            # Ativação das regras: mínimo entre os três antecedentes, com forma (regras, N)
+            firing = np.minimum(memberships[0][rules[:, 0]], memberships[1][rules[:, 1]])
+            np.minimum(firing, memberships[2][rules[:, 2]], out = firing)
+
+            for o, (universe, mfs) in enumerate(zip(self._output_universes, self._output_mfs)):
+
+                # Ativação de cada termo de saída: máximo entre as regras que o usam
+                cuts = np.zeros((len(mfs), firing.shape[1]))
+                np.maximum.at(cuts, rules[:, 3 + o], firing)
+                outputs[o][start:stop] = self._defuzz_batch(universe, mfs, cuts)
+
+        return [output.reshape(shape) for output in outputs]
 
     def plot_input_mfs(self):
 
+        # O matplotlib só é importado quando algum gráfico é pedido
+        import matplotlib.pyplot as plt
+        self._ensure_fuzzy_system()
+
         # Plota os gráficos das funções de entrada
         self._temperature.view()
         self._pressure.view()
@@ -176,6 +569,9 @@ class ARTC:
 
     def plot_output_mfs(self):
 
+        import matplotlib.pyplot as plt
+        self._ensure_fuzzy_system()
+
         # Plota os gráficos das funções de saída
         self._heater.view()
         self._chiller.view()
@@ -185,6 +581,9 @@ class ARTC:
 
     def plot_output_simulation(self):
 
+        import matplotlib.pyplot as plt
+        self._ensure_fuzzy_system()
+
         # Plota os gráficos das funções de saída com o valor da simulação
         self._heater.view(sim = self._simulation)
         self._chiller.view(sim = self._simulation)
@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import artc
+import benchmark_startup
+import control_loop
+import iot
+
+# Suíte de medidas do caminho sensor -> inferência -> atuação, com sensores falsos, que grava
+# os resultados em JSON para comparar versões
+
+def universe_points(control, count, seed = 0):
+
+    # Pontos aleatórios (com semente fixa) cobrindo os universos completos das três entradas
+    rng = np.random.default_rng(seed)
+    return np.array([rng.uniform(universe[0], universe[-1], count) for universe in control._input_universes]).T
+
+def room_trace(count, seed = 0):
+
+    # Leituras como as de uma sala ao longo do tempo: temperatura e umidade inteiras (como as do
+    # DHT11) variando devagar e pressão com 2 casas decimais, que se repetem como as leituras reais
+    rng = np.random.default_rng(seed)
+    temperature = np.round(22.0 + np.cumsum(rng.normal(0.0, 0.05, count)))
+    humidity = np.clip(np.round(50.0 + np.cumsum(rng.normal(0.0, 0.1, count))), 0.0, 99.0)
+    pressure = np.round(1013.25 + np.cumsum(rng.normal(0.0, 0.02, count)), 2)
+    return np.array([temperature, pressure, humidity]).T
+
+def distribution(samples):
+
+    # Resumo de uma lista de tempos, em microssegundos
+    samples = np.asarray(samples) * 1e6
+    return {
+        'count': int(len(samples)),
+        'mean_us': float(samples.mean()),
+        'p50_us': float(np.percentile(samples, 50)),
+        'p99_us': float(np.percentile(samples, 99)),
+        'max_us': float(samples.max()),
+    }
+
+def construct(memory = True, **options):
+
+    # Tempo de construção do ARTC; a memória alocada (tracemalloc) é medida numa segunda
+    # construção, porque o rastreamento deixa a construção bem mais lenta
+    started = time.perf_counter()
+    control = artc.ARTC(**options)
+    elapsed = time.perf_counter() - started
+    if not memory:
+        return control, {'seconds': elapsed}
+
+    tracemalloc.start()
+    traced = artc.ARTC(**options)
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del traced
+    return control, {'seconds': elapsed, 'allocated_mb': allocated / 2 ** 20}
+
+def inference_latency(control, points):
+
+    # Latência de cada chamada a compute_simulation; leituras em que nenhuma regra é ativada
+    # (temperatura acima do termo Hot, por exemplo) são contadas à parte
+    samples, inactive = [], 0
+    clock = time.perf_counter
+    for temperature, pressure, humidity in points.tolist():
+        started = clock()
+        try:
+            control.compute_simulation(temperature, pressure, humidity)
+        except (KeyError, ValueError):
+            inactive += 1
+            continue
+        samples.append(clock() - started)
+    result = distribution(samples)
+    result['inactive'] = inactive
+    return result
+
+def batch_throughput(control, points):
+    started = time.perf_counter()
+    control.compute_batch(points[:, 0], points[:, 1], points[:, 2])
+    elapsed = time.perf_counter() - started
+    return {'readings': len(points), 'seconds': elapsed, 'readings_per_second': len(points) / elapsed}
+
+def pipeline(control, steps, profile):
+
+    # Laço completo com sensores falsos lidos diretamente; com max_staleness zero todos os
+    # passos fazem a inferência, e a temperatura varia para percorrer as regras
+    dht11 = iot.FakeDHT11Monitor(seed = 0)
+    bmp280 = iot.FakeBMP280Monitor(seed = 0)
+    temperatures = np.linspace(-20.0, 50.0, steps)
+    outputs = []
+
+    def read():
+        dht11.temperature = temperatures[loop.computed % steps]
+        return iot.read_sensors(dht11, bmp280)
+
+    def actuate(reading, control, sample):
+        outputs.append((control.heater_potency, control.chiller_potency))
+
+    timer = control_loop.StageTimer(capacity = steps) if profile else None
+    loop = control_loop.ControlLoop(control, read, actuate, max_staleness = 0.0, timer = timer)
+    started = time.perf_counter()
+    for _ in range(steps):
+        loop.step()
+    elapsed = time.perf_counter() - started
+
+    result = {'steps': steps, 'step_mean_us': elapsed / steps * 1e6}
+    if timer is not None:
+        result['stages'] = timer.summary()
+    return result
+
+def run(args):
+
+    # Sem --cache-dir os caches ficam num diretório temporário, removido no fim
+    with tempfile.TemporaryDirectory() as temporary:
+        return run_in(args, args.cache_dir or temporary)
+
+def run_in(args, directory):
+    definition_path = os.path.join(directory, 'artc-definition.npz')
+    table_path = os.path.join(directory, 'artc-table.npz')
+    results = {}
+
+    # Importação e construção em processos novos, com e sem o cache da definição
+    benchmark_startup.measure(True, definition_path, 1)
+    for name, sparse, path in (('skfuzzy', False, None), ('sparse_cached', True, definition_path)):
+        imported, built = benchmark_startup.measure(sparse, path, args.runs)
+        results.setdefault('import_seconds', imported)
+        results['startup_' + name] = {'import_seconds': imported, 'construct_seconds': built}
+
+    # Construção e memória no próprio processo, para cada modo
+    controls = {}
+    for name, options in (
+        ('skfuzzy', {}),
+        ('sparse', {'sparse': True, 'definition_path': definition_path}),
+        ('sparse_cache', {'sparse': True, 'definition_path': definition_path, 'cache_size': 4096, 'cache_step': 0.5}),
+    ):
+        controls[name], results['construct_' + name] = construct(**options)
+
+    # Modo compilado: a primeira construção gera e salva a tabela (medida só em tempo, pois
+    # leva cerca de um minuto) e a segunda apenas a carrega, como nas reinicializações
+    if os.path.exists(table_path):
+        os.remove(table_path)
+    options = {'compiled': True, 'table_path': table_path, 'definition_path': definition_path}
+    _, results['construct_compiled_cold'] = construct(memory = False, **options)
+    controls['compiled'], results['construct_compiled_warm'] = construct(**options)
+
+    # Latência por inferência nos universos completos; o skfuzzy é bem mais lento e usa menos pontos
+    points = universe_points(controls['sparse'], args.points)
+    for name in ('skfuzzy', 'sparse', 'compiled'):
+        count = min(args.points, args.skfuzzy_points) if name == 'skfuzzy' else args.points
+        results['latency_' + name] = inference_latency(controls[name], points[:count])
+
+    # O cache só ajuda quando as leituras se repetem, então ele é medido com uma sequência de
+    # leituras de sala, comparada com o modo esparso sem cache na mesma sequência
+    trace = room_trace(args.points)
+    results['latency_sparse_trace'] = inference_latency(controls['sparse'], trace)
+    results['latency_sparse_cache'] = inference_latency(controls['sparse_cache'], trace)
+    results['cache_info'] = controls['sparse_cache'].cache_info()
+
+    # Vazão do cálculo vetorizado
+    results['batch'] = batch_throughput(controls['sparse'], universe_points(controls['sparse'], args.batch, seed = 1))
+
+    # Laço de controle com e sem as medições por etapa
+    results['pipeline'] = pipeline(controls['sparse'], args.steps, profile = False)
+    results['pipeline_profiled'] = pipeline(controls['sparse'], args.steps, profile = True)
+
+    return results
+
+def flatten(results, prefix = ''):
+
+    # Métricas numéricas em um único nível, com nomes separados por pontos
+    flat = {}
+    for key, value in results.items():
+        name = prefix + str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare(old, new):
+
+    # Imprime a razão novo/antigo de cada métrica presente nos dois resultados
+    old, new = flatten(old['results']), flatten(new['results'])
+    for name in sorted(set(old) & set(new)):
+        if old[name]:
+            print("{:<50} {:>14.4g} {:>14.4g} {:>8.2f}x".format(name, old[name], new[name], new[name] / old[name]))
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', default = 'benchmark-results.json')
+    parser.add_argument('--compare', default = None, help = 'previous results file to compare against')
+    parser.add_argument('--cache-dir', default = None, help = 'directory for the definition and table caches')
+    parser.add_argument('--runs', type = int, default = 3)
+    parser.add_argument('--points', type = int, default = 5000)
+    parser.add_argument('--skfuzzy-points', type = int, default = 200)
+    parser.add_argument('--batch', type = int, default = 100000)
+    parser.add_argument('--steps', type = int, default = 2000)
+    args = parser.parse_args()
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'numpy': np.__version__,
+        'results': run(args),
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent = 2, sort_keys = True)
+    print("Results written to {}".format(args.output))
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+# Mede o tempo de inicialização do ARTC (importação + construção) em um processo novo,
+# como acontece quando o app.py é reiniciado, com e sem o cache da definição do controlador
+
+SCRIPT = '''
+import time
+start = time.perf_counter()
+import artc
+imported = time.perf_counter()
+artc.ARTC(sparse = {sparse}, definition_path = {path!r})
+built = time.perf_counter()
+print(imported - start, built - imported)
+'''
+
+def measure(sparse, path, runs):
+
+    # Executa cada medida em um interpretador novo, para que nada fique em cache na memória
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', SCRIPT.format(sparse = sparse, path = path)], cwd = here)
+        results.append([float(value) for value in output.split()])
+    return min(results, key = sum)
+
+if __name__ == '__main__':
+
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'artc-definition.npz')
+
+        # Gera o cache da definição uma vez, como na primeira inicialização
+        measure(True, path, 1)
+
+        cases = [
+            ('skfuzzy, sem cache', False, None),
+            ('esparso, sem cache', True, None),
+            ('esparso, com cache', True, path),
+        ]
+
+        print("{:<20} {:>12} {:>12} {:>12}".format('Modo', 'Import (s)', 'ARTC() (s)', 'Total (s)'))
+        for name, sparse, definition_path in cases:
+            imported, built = measure(sparse, definition_path, runs)
+            print("{:<20} {:>12.3f} {:>12.3f} {:>12.3f}".format(name, imported, built, imported + built))
@@ -0,0 +1,71 @@
+import argparse
+import random
+import time
+import artc
+import iot
+import zones
+
+# Simula muitas salas com sensores falsos e mede a vazão dos ciclos e a memória usada
+
+def rss_mb():
+
+    # Memória residente do processo atual, em MB (Linux)
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024.0
+
+def fake_config(count, poll, seed = 0):
+
+    # Salas com temperatura, pressão e umidade diferentes, espalhadas pelas faixas das regras
+    rng = random.Random(seed)
+    config = {}
+    for i in range(count):
+        config['room-{:04d}'.format(i)] = {
+            'dht11': iot.FakeDHT11Monitor(humidity = rng.uniform(10.0, 90.0), temperature = rng.uniform(-10.0, 45.0), seed = i),
+            'bmp280': iot.FakeBMP280Monitor(temperature = rng.uniform(-10.0, 45.0), pressure = rng.uniform(600.0, 1400.0), seed = i),
+            'poll': poll,
+        }
+    return config
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--zones', type = int, default = 1000)
+    parser.add_argument('--ticks', type = int, default = 5)
+    parser.add_argument('--workers', type = int, default = None)
+    parser.add_argument('--executor', choices = ['thread', 'process'], default = 'thread')
+    parser.add_argument('--poll', action = 'store_true', help = 'read the fake sensors in background threads')
+    parser.add_argument('--definition-path', default = None)
+    args = parser.parse_args()
+
+    baseline = rss_mb()
+    control = artc.ARTC(sparse = True, definition_path = args.definition_path)
+    with_control = rss_mb()
+
+    controller = zones.ZoneController(control, executor = args.executor, workers = args.workers)
+    controller.configure(fake_config(args.zones, args.poll))
+    for zone in controller.zones.values():
+        if zone.acquisition is not None:
+            zone.acquisition.wait()
+    with_zones = rss_mb()
+
+    # O primeiro ciclo aquece o pool (criação de threads ou processos) e não entra na medida
+    controller.tick()
+    started = time.perf_counter()
+    evaluated = sum(controller.tick() for _ in range(args.ticks))
+    elapsed = time.perf_counter() - started
+    errors = sum(zone.error is not None for zone in controller.zones.values())
+    controller.shutdown()
+
+    print("Zones:             {}".format(args.zones))
+    print("Executor:          {} ({} workers)".format(args.executor, args.workers or 'default'))
+    print("Throughput:        {:.0f} zones/s".format(evaluated / elapsed))
+    print("Tick duration:     {:.1f} ms".format(elapsed / args.ticks * 1000))
+    print("Zones with errors: {}".format(errors))
+    if args.executor == 'process':
+        print("ARTC:              {:.1f} MB, copied into each worker process".format(with_control - baseline))
+    else:
+        print("Shared ARTC:       {:.1f} MB".format(with_control - baseline))
+    print("Per zone:          {:.1f} KB".format((with_zones - with_control) * 1024 / args.zones))
+    print("Process RSS:       {:.1f} MB".format(with_zones))
@@ -0,0 +1,54 @@
+import collections
+
+# Cache LRU de tamanho limitado para as saídas do controlador, com as entradas quantizadas
+class QuantizedCache:
+    def __init__(self, size, step):
+
+        # step pode ser um único passo para todas as entradas ou um passo por entrada
+        self.size = size
+        self.step = step
+        self._entries = collections.OrderedDict()
+
+        # Contadores de uso
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def quantize(self, values):
+
+        # Chave das entradas: o índice do múltiplo mais próximo do passo de cada uma, em inteiros,
+        # para que erros de ponto flutuante não criem chaves diferentes
+        steps = self.step if isinstance(self.step, (tuple, list)) else (self.step,) * len(values)
+        return tuple(int(round(value / step)) for value, step in zip(values, steps))
+
+    def get(self, key):
+
+        # Retorna o valor guardado (e o marca como o mais recente) ou None
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+
+        # Guarda o valor, descartando o usado há mais tempo quando o cache está cheio
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.size:
+            self._entries.popitem(last = False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def info(self):
+        return {
+            'size': self.size,
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,75 @@
+import argparse
+import sys
+import numpy as np
+import artc
+
+# Confere os caminhos rápidos do ARTC contra o skfuzzy; termina com erro se algum deles divergir
+
+# Leituras que já divergiram do skfuzzy em versões anteriores
+REGRESSIONS = [
+    (29.85, 1318.1, 95.06),
+    (-0.0646, 768.5, 10.35),
+]
+
+def reference_points(control, count, seed = 0):
+
+    # Pontos aleatórios (com semente fixa) onde alguma regra é ativada, mais as regressões;
+    # acima de 54 °C nenhum termo de temperatura é ativado e o skfuzzy não gera saída
+    rng = np.random.default_rng(seed)
+    universes = control._input_universes
+    points = np.array([rng.uniform(-30.0, 53.9, count),
+                       rng.uniform(universes[1][0], universes[1][-1], count),
+                       rng.uniform(universes[2][0], universes[2][-1], count)]).T
+    return np.concatenate((np.array(REGRESSIONS), points))
+
+def skfuzzy_outputs(control, points):
+
+    # Saídas do skfuzzy (sem arredondamento) para vários pontos de uma vez, usando uma
+    # simulação separada do sistema do ARTC para não interferir no estado dele
+    from skfuzzy import control as fuzzy_control
+    control._ensure_fuzzy_system()
+    simulation = fuzzy_control.ControlSystemSimulation(control._weather_control)
+    simulation.input['Temperature'] = points[:, 0]
+    simulation.input['Pressure'] = points[:, 1]
+    simulation.input['Humidity'] = points[:, 2]
+    simulation.compute()
+    return simulation.output['Heater'], simulation.output['Chiller']
+
+def check_batch(control, points, expected):
+
+    # compute_batch deve reproduzir as potências arredondadas do skfuzzy
+    heater, chiller = control.compute_batch(points[:, 0], points[:, 1], points[:, 2])
+    wrong = (heater != np.round(expected[0], 2) * 100) | (chiller != np.round(expected[1], 2) * 100)
+    for point in points[wrong]:
+        print("compute_batch differs from skfuzzy at {}".format(tuple(point)))
+    return not wrong.any()
+
+def check_table(control, points, expected, max_error):
+
+    # A tabela (ou as regras, nas leituras que ela não cobre) deve ficar a no máximo
+    # max_error pontos percentuais do skfuzzy, antes do arredondamento
+    ok = True
+    for point, heater, chiller in zip(points.tolist(), *expected):
+        potency = control._table.lookup(*point) or control._rule_index.compute(*point)
+        error = max(abs(potency[0] - heater), abs(potency[1] - chiller)) * 100
+        if error > max_error:
+            print("lookup table error {:.2f} % at {}".format(error, tuple(point)))
+            ok = False
+    return ok
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type = int, default = 3000)
+    parser.add_argument('--max-error', type = float, default = 1.0)
+    parser.add_argument('--table-path', default = None, help = 'lookup table cache (the table takes about a minute to build)')
+    args = parser.parse_args()
+
+    control = artc.ARTC(compiled = True, max_error = args.max_error, table_path = args.table_path)
+    points = reference_points(control, args.points)
+    expected = skfuzzy_outputs(control, points)
+
+    ok = check_batch(control, points, expected)
+    ok = check_table(control, points, expected, args.max_error) and ok
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,154 @@
+import collections
+import sched
+import time
+
+# Tempos de cada etapa do laço (aquisição, inferência e atuação), guardando as últimas medidas
+class StageTimer:
+    def __init__(self, capacity = 1024, clock = time.perf_counter):
+        self.clock = clock
+        self._samples = collections.defaultdict(lambda: collections.deque(maxlen = capacity))
+
+    def record(self, stage, seconds):
+        self._samples[stage].append(seconds)
+
+    def summary(self):
+
+        # Para cada etapa: número de medidas, média, p50, p99 e máximo, em segundos
+        result = {}
+        for stage, samples in self._samples.items():
+            ordered = sorted(samples)
+            result[stage] = {
+                'count': len(ordered),
+                'mean': sum(ordered) / len(ordered),
+                'p50': ordered[int(0.50 * (len(ordered) - 1))],
+                'p99': ordered[int(0.99 * (len(ordered) - 1))],
+                'max': ordered[-1],
+            }
+        return result
+
+# Laço de controle orientado a eventos: recalcula as saídas do ARTC apenas quando alguma leitura
+# sai da zona morta (deadband) ou quando o último cálculo fica velho demais
+class ControlLoop:
+    def __init__(self, control, read, on_update = None, deadband = (0.5, 1.0, 1.0), max_staleness = 300.0,
+                 min_interval = 1.0, max_interval = 30.0, backoff = 1.5, clock = time.monotonic, sleep = time.sleep,
+                 timer = None, on_error = None):
+
+        # read() retorna (timestamp, (temperatura, pressão, umidade), sample), com o timestamp da
+        # leitura em segundos desde a época e as leituras brutas em sample (um iot.RoomSample, por
+        # exemplo); on_update(reading, control, sample) é chamado após cada cálculo. Quando read()
+        # gera ValueError (leituras velhas demais, por exemplo) o passo é descartado e
+        # on_error(error) é chamado
+        self.control = control
+        self.read = read
+        self.on_update = on_update
+        self.on_error = on_error
+
+        # Variação mínima de cada entrada (°C, hPa, %) para que as saídas sejam recalculadas,
+        # e tempo máximo, em segundos, sem recalcular
+        self.deadband = deadband
+        self.max_staleness = max_staleness
+
+        # O intervalo entre consultas cai para min_interval quando as leituras mudam e
+        # cresce aos poucos (multiplicado por backoff) até max_interval quando ficam estáveis
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+
+        self.clock = clock
+        self._scheduler = sched.scheduler(clock, sleep)
+
+        # StageTimer opcional; quando é None as medições não custam mais que um teste por etapa
+        self.timer = timer
+
+        # Última leitura usada num cálculo e a leitura anterior, para detectar mudanças rápidas
+        self._computed_reading = None
+        self._computed_at = None
+        self._previous_reading = None
+
+        # Estatísticas do laço
+        self.computed = 0
+        self.skipped = 0
+        self.read_errors = 0
+        self.latency_last = None
+        self.latency_max = 0.0
+        self._latency_sum = 0.0
+
+    def _moved(self, reading, reference):
+
+        # Verifica se alguma entrada saiu da zona morta em relação à leitura de referência
+        return reference is None or any(abs(r - p) > d for r, p, d in zip(reading, reference, self.deadband))
+
+    def step(self):
+
+        timer = self.timer
+        if timer is not None:
+            started = timer.clock()
+
+        try:
+            timestamp, reading, sample = self.read()
+        except ValueError as error:
+
+            # Sem leitura válida: tenta de novo no intervalo mínimo
+            self.read_errors += 1
+            self.interval = self.min_interval
+            if self.on_error is not None:
+                self.on_error(error)
+            return
+        now = self.clock()
+
+        if timer is not None:
+            acquired = timer.clock()
+            timer.record('acquire', acquired - started)
+
+        stale = self._computed_at is None or now - self._computed_at >= self.max_staleness
+        if stale or self._moved(reading, self._computed_reading):
+
+            # Recalcula as saídas e mede a latência desde o instante da leitura
+            self.control.compute_simulation(*reading)
+            if timer is not None:
+                inferred = timer.clock()
+                timer.record('infer', inferred - acquired)
+            self.latency_last = time.time() - timestamp
+            self.latency_max = max(self.latency_max, self.latency_last)
+            self._latency_sum += self.latency_last
+            self.computed += 1
+            self._computed_reading = reading
+            self._computed_at = now
+            if self.on_update is not None:
+                self.on_update(reading, self.control, sample)
+                if timer is not None:
+                    timer.record('actuate', timer.clock() - inferred)
+
+        else:
+            self.skipped += 1
+
+        # Consulta mais rápido enquanto as leituras mudam e desacelera quando ficam estáveis
+        if self._moved(reading, self._previous_reading):
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        self._previous_reading = reading
+
+    def _tick(self):
+        self.step()
+        self._scheduler.enter(self.interval, 0, self._tick)
+
+    def run(self):
+
+        # Executa o laço indefinidamente
+        self._scheduler.enter(0, 0, self._tick)
+        self._scheduler.run()
+
+    def stats(self):
+
+        # Resumo do laço: cálculos feitos e evitados, e latência (em segundos) dos cálculos
+        return {
+            'computed': self.computed,
+            'skipped': self.skipped,
+            'read_errors': self.read_errors,
+            'interval': self.interval,
+            'latency_last': self.latency_last,
+            'latency_mean': self._latency_sum / self.computed if self.computed else None,
+            'latency_max': self.latency_max if self.computed else None,
+        }
@@ -1,15 +1,20 @@
-import bmp280
-import Adafruit_DHT
-import RPi.GPIO as GPIO
-
-try:
-    from smbus2 import SMBus
-except ImportError:
-    from smbus import SMBus
+import collections
+import random
+import threading
+import time
 
 class BMP280Monitor:
     def __init__(self):
-        
+
+        # As bibliotecas do hardware são importadas aqui para que o módulo possa ser usado
+        # com os sensores falsos em máquinas sem I2C
+        import bmp280
+
+        try:
+            from smbus2 import SMBus
+        except ImportError:
+            from smbus import SMBus
+
         # Inicializa o driver do sensor de temperatura e pressão BMP280
         bus = SMBus(1)
         self._bmp280 = bmp280.BMP280(i2c_dev=bus)
@@ -24,10 +29,19 @@ class BMP280Monitor:
         #Obtém a pressão no sensor
         return self._bmp280.get_pressure()
 
+    def get_temperature_and_pressure(self):
+
+        # Lê a temperatura e a pressão em uma única leitura do barramento I2C
+        self._bmp280.update_sensor()
+        return self._bmp280.temperature, self._bmp280.pressure
+
 class DHT11Monitor:
     def __init__(self):
+        import Adafruit_DHT
+        import RPi.GPIO as GPIO
 
         # Inicializa o driver de temperatura e umidade DHT11
+        self._dht = Adafruit_DHT
         self.sensor = Adafruit_DHT.DHT11
         GPIO.setmode(GPIO.BOARD)
         self.pin = 25
@@ -35,4 +49,226 @@ class DHT11Monitor:
     def get_humidity_and_temperature(self):
 
         # Obtém a temperatura e a umidade do sensor e retorna como uma tupla
-        return Adafruit_DHT.read_retry(self.sensor, self.pin)
\ No newline at end of file
+        return self._dht.read_retry(self.sensor, self.pin)
+
+class FakeBMP280Monitor:
+    def __init__(self, temperature = 22.0, pressure = 1013.25, noise = 0.05, delay = 0.0, seed = None):
+
+        # Sensor falso com a mesma interface do BMP280Monitor; os valores podem ser
+        # alterados a qualquer momento pelos atributos temperature e pressure
+        self.temperature = temperature
+        self.pressure = pressure
+        self.noise = noise
+        self.delay = delay
+        self._random = random.Random(seed)
+
+    def get_temperature(self):
+        return self.get_temperature_and_pressure()[0]
+
+    def get_pressure(self):
+        return self.get_temperature_and_pressure()[1]
+
+    def get_temperature_and_pressure(self):
+
+        # Simula o tempo de leitura do barramento e o ruído do sensor
+        if self.delay:
+            time.sleep(self.delay)
+        return (self.temperature + self._random.gauss(0.0, self.noise),
+                self.pressure + self._random.gauss(0.0, self.noise))
+
+class FakeDHT11Monitor:
+    def __init__(self, humidity = 50.0, temperature = 22.0, failure_rate = 0.0, delay = 0.0, seed = None):
+
+        # Sensor falso com a mesma interface do DHT11Monitor; failure_rate é a chance de
+        # uma leitura falhar, como acontece com o read_retry quando esgota as tentativas
+        self.humidity = humidity
+        self.temperature = temperature
+        self.failure_rate = failure_rate
+        self.delay = delay
+        self._random = random.Random(seed)
+
+    def get_humidity_and_temperature(self):
+
+        if self.delay:
+            time.sleep(self.delay)
+        if self._random.random() < self.failure_rate:
+            return None, None
+
+        # O DHT11 só informa valores inteiros
+        return float(round(self.humidity)), float(round(self.temperature))
+
+# Leitura de um sensor com o instante em que foi feita (segundos desde a época, como time.time())
+Sample = collections.namedtuple('Sample', ['timestamp', 'value'])
+
+class RingBuffer:
+    def __init__(self, capacity):
+
+        # Guarda apenas as últimas leituras; as mais antigas são descartadas
+        self._samples = collections.deque(maxlen = capacity)
+        self._lock = threading.Lock()
+
+    def append(self, sample):
+        with self._lock:
+            self._samples.append(sample)
+
+    def latest(self):
+
+        # Leitura mais recente, ou None se ainda não houver nenhuma
+        with self._lock:
+            return self._samples[-1] if self._samples else None
+
+    def samples(self):
+        with self._lock:
+            return list(self._samples)
+
+class SensorPoller:
+    def __init__(self, name, read, interval, capacity = 64):
+
+        # Lê o sensor a cada interval segundos em uma thread própria; leituras que falham
+        # (exceção ou retorno None) são descartadas e a anterior continua valendo
+        self.name = name
+        self.interval = interval
+        self.buffer = RingBuffer(capacity)
+        self.errors = 0
+        self._read = read
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target = self._run, name = 'poller-' + name, daemon = True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                value = self._read()
+            except Exception:
+                value = None
+            if value is None:
+                self.errors += 1
+            else:
+                self.buffer.append(Sample(time.time(), value))
+                self._ready.set()
+
+            # Mantém o período mesmo quando a leitura demora, sem acumular atrasos
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, timeout = None):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def wait(self, timeout = None):
+
+        # Espera a primeira leitura válida; retorna False se o tempo acabar antes
+        return self._ready.wait(timeout)
+
+    def latest(self):
+        return self.buffer.latest()
+
+class Acquisition:
+    def __init__(self, capacity = 64):
+
+        # Conjunto de sensores lidos em segundo plano, cada um no seu próprio período
+        self.capacity = capacity
+        self._pollers = collections.OrderedDict()
+
+    def add(self, name, read, interval):
+        self._pollers[name] = SensorPoller(name, read, interval, self.capacity)
+
+    def start(self):
+        for poller in self._pollers.values():
+            poller.start()
+
+    def stop(self, timeout = None):
+        for poller in self._pollers.values():
+            poller.stop(timeout)
+
+    def wait(self, timeout = None):
+
+        # Espera até que todos os sensores tenham ao menos uma leitura válida
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for poller in self._pollers.values():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not poller.wait(remaining):
+                return False
+        return True
+
+    def latest(self, name):
+
+        # Leitura mais recente do sensor, sem bloquear
+        return self._pollers[name].latest()
+
+    def history(self, name):
+        return self._pollers[name].buffer.samples()
+
+    def errors(self, name):
+        return self._pollers[name].errors
+
+def room_acquisition(dht11, bmp280, dht11_interval = 2.0, bmp280_interval = 1.0, capacity = 64):
+
+    # Aquisição de uma sala: 'dht11' guarda (umidade, temperatura) e 'bmp280' guarda (temperatura, pressão)
+    def read_dht11():
+        humidity, temperature = dht11.get_humidity_and_temperature()
+        return None if humidity is None else (humidity, temperature)
+
+    acquisition = Acquisition(capacity)
+    acquisition.add('dht11', read_dht11, dht11_interval)
+    acquisition.add('bmp280', bmp280.get_temperature_and_pressure, bmp280_interval)
+    return acquisition
+
+# Origem da temperatura usada pelo controlador
+DHT11_SOURCE = 0
+BMP280_SOURCE = 1
+
+# Leituras brutas de uma sala em um ciclo, com a origem da temperatura escolhida
+RoomSample = collections.namedtuple('RoomSample', ['timestamp', 'dht11_humidity', 'dht11_temperature',
+                                                   'bmp280_temperature', 'bmp280_pressure', 'source'])
+
+def room_inputs(sample):
+
+    # Entradas do controlador (temperatura, pressão, umidade) a partir das leituras brutas
+    temperature = sample.bmp280_temperature if sample.source == BMP280_SOURCE else sample.dht11_temperature
+    return round(temperature, 2), round(sample.bmp280_pressure, 2), sample.dht11_humidity
+
+def room_sample(acquisition, dht11_max_age = 60.0, humidity_max_age = 600.0, bmp280_max_age = 60.0):
+
+    # Obtém a temperatura, pressão e umidade das leituras mais recentes da aquisição
+    dht11 = acquisition.latest('dht11')
+    bmp280 = acquisition.latest('bmp280')
+    temperature2, pressure = bmp280.value
+    humidity, temperature1 = dht11.value
+
+    # A pressão só vem do BMP280 e a umidade só do DHT11; sem uma leitura recente de cada um
+    # não há como calcular as saídas. A umidade muda devagar e pode ser mais antiga
+    now = time.time()
+    if now - bmp280.timestamp > bmp280_max_age:
+        raise ValueError("BMP280 reading is {:.0f} s old".format(now - bmp280.timestamp))
+    if now - dht11.timestamp > humidity_max_age:
+        raise ValueError("DHT11 reading is {:.0f} s old".format(now - dht11.timestamp))
+
+    # Usa por padrão a temperatura do DHT11, caso ela esteja desatualizada, usa do BMP280
+    stale = now - dht11.timestamp > dht11_max_age
+    source = BMP280_SOURCE if stale or temperature1 is None else DHT11_SOURCE
+
+    # O instante da leitura é o da amostra mais antiga usada para a temperatura e a pressão
+    timestamp = bmp280.timestamp if source == BMP280_SOURCE else min(dht11.timestamp, bmp280.timestamp)
+    return RoomSample(timestamp, humidity, temperature1, temperature2, pressure, source)
+
+def read_room(acquisition, dht11_max_age = 60.0, humidity_max_age = 600.0, bmp280_max_age = 60.0):
+
+    # Leitura no formato do ControlLoop: (timestamp, entradas do controlador, leituras brutas)
+    sample = room_sample(acquisition, dht11_max_age, humidity_max_age, bmp280_max_age)
+    return sample.timestamp, room_inputs(sample), sample
+
+def read_sensors(dht11, bmp280):
+
+    # Lê os sensores diretamente, sem aquisição em segundo plano, com a mesma escolha de temperatura;
+    # a umidade só vem do DHT11, então uma leitura que falhou não tem como ser usada
+    humidity, temperature1 = dht11.get_humidity_and_temperature()
+    if humidity is None:
+        raise ValueError("DHT11 read failed")
+    temperature2, pressure = bmp280.get_temperature_and_pressure()
+    source = BMP280_SOURCE if temperature1 is None else DHT11_SOURCE
+    sample = RoomSample(time.time(), humidity, temperature1, temperature2, pressure, source)
+    return sample.timestamp, room_inputs(sample), sample
@@ -0,0 +1,125 @@
+import bisect
+import os
+import numpy as np
+
+# Tabela de consulta (lookup table) 3-D para as saídas do controlador fuzzy
+class LookupTable:
+    def __init__(self, temperature_axis, pressure_axis, humidity_axis, heater, chiller, fingerprint = '', exact = None,
+                 max_error = None, min_width = None):
+
+        # Eixos da grade (crescentes, não necessariamente uniformes)
+        self.temperature_axis = np.asarray(temperature_axis, dtype = np.float64)
+        self.pressure_axis    = np.asarray(pressure_axis, dtype = np.float64)
+        self.humidity_axis    = np.asarray(humidity_axis, dtype = np.float64)
+
+        # Saídas pré-calculadas em cada ponto da grade, com forma (T, P, H)
+        self.heater  = np.asarray(heater, dtype = np.float64)
+        self.chiller = np.asarray(chiller, dtype = np.float64)
+
+        # Células, com forma (T - 1, P - 1, H - 1), onde a interpolação não atinge a precisão pedida
+        # (saltos da saída perto dos vértices das funções de pertinência); nelas retorna None
+        cells = tuple(len(axis) - 1 for axis in (self.temperature_axis, self.pressure_axis, self.humidity_axis))
+        self.exact = np.zeros(cells, dtype = bool) if exact is None else np.asarray(exact, dtype = bool)
+
+        # Identifica a definição do controlador usada para gerar a tabela e os parâmetros da geração:
+        # o erro máximo garantido (em pontos percentuais) e a menor largura de célula em cada eixo
+        self.fingerprint = fingerprint
+        self.max_error = max_error
+        self.min_width = min_width
+
+        # Cópias em listas do Python, bem mais rápidas para consultas escalares
+        self._axes = (self.temperature_axis.tolist(), self.pressure_axis.tolist(), self.humidity_axis.tolist())
+        self._heater  = self.heater.tolist()
+        self._chiller = self.chiller.tolist()
+        self._exact   = self.exact.tolist()
+
+    @staticmethod
+    def _locate(axis, value):
+
+        # Encontra a célula que contém o valor e a posição relativa dentro dela
+        i = min(bisect.bisect_right(axis, value) - 1, len(axis) - 2)
+        return i, (value - axis[i]) / (axis[i + 1] - axis[i])
+
+    def lookup(self, temperature, pressure, humidity):
+
+        # A grade cobre apenas a região onde alguma regra é ativada; fora dela, e nas células
+        # marcadas como exatas, retorna None e a leitura deve ser avaliada pelas regras
+        axes = self._axes
+        if not (axes[0][0] <= temperature <= axes[0][-1] and axes[1][0] <= pressure <= axes[1][-1]
+                and axes[2][0] <= humidity <= axes[2][-1]):
+            return None
+
+        # Localiza a célula da grade em cada eixo
+        i, u = self._locate(axes[0], temperature)
+        j, v = self._locate(axes[1], pressure)
+        k, w = self._locate(axes[2], humidity)
+        if self._exact[i][j][k]:
+            return None
+
+        # Interpolação trilinear entre os 8 vértices da célula
+        def interpolate(table):
+            c00 = table[i][j][k] * (1.0 - w) + table[i][j][k + 1] * w
+            c01 = table[i][j + 1][k] * (1.0 - w) + table[i][j + 1][k + 1] * w
+            c10 = table[i + 1][j][k] * (1.0 - w) + table[i + 1][j][k + 1] * w
+            c11 = table[i + 1][j + 1][k] * (1.0 - w) + table[i + 1][j + 1][k + 1] * w
+            c0 = c00 * (1.0 - v) + c01 * v
+            c1 = c10 * (1.0 - v) + c11 * v
+            return c0 * (1.0 - u) + c1 * u
+
+        return interpolate(self._heater), interpolate(self._chiller)
+
+    def save(self, path):
+
+        # Salva a tabela em um arquivo .npz compactado, escrito ao lado do definitivo e só então
+        # renomeado, para que uma escrita interrompida nunca deixe uma tabela truncada no caminho
+        # Em caso de erro o arquivo temporário é removido e a exceção repassada
+        temporary = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            with open(temporary, 'wb') as f:
+                np.savez_compressed(f,
+                    temperature_axis = self.temperature_axis,
+                    pressure_axis = self.pressure_axis,
+                    humidity_axis = self.humidity_axis,
+                    heater = self.heater,
+                    chiller = self.chiller,
+                    exact = self.exact,
+                    fingerprint = np.array(self.fingerprint),
+                    max_error = np.array(self.max_error, dtype = np.float64),
+                    min_width = np.array(self.min_width, dtype = np.float64))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    @classmethod
+    def load(cls, path):
+
+        # Carrega uma tabela salva anteriormente com save()
+        with np.load(path) as data:
+            return cls(data['temperature_axis'], data['pressure_axis'], data['humidity_axis'],
+                       data['heater'], data['chiller'], str(data['fingerprint']), data['exact'],
+                       float(data['max_error']), tuple(data['min_width'].tolist()))
+
+def grid_axis(universe, mfs, subdivisions):
+
+    # Considera apenas a região do universo onde alguma função de pertinência é não nula,
+    # pois fora dela nenhuma regra é ativada
+    covered = np.flatnonzero(np.max(mfs, axis = 0) > 0.0)
+    first, last = covered[0], covered[-1]
+
+    # Os vértices das funções de pertinência são os pontos onde a segunda diferença não é nula
+    kinks = np.flatnonzero(np.any(np.abs(np.diff(mfs, n = 2, axis = 1)) > 1e-9, axis = 0)) + 1
+    knots = np.unique(np.concatenate(([first, last], kinks[(kinks > first) & (kinks < last)])))
+
+    # Entre dois vértices as pertinências são lineares: se forem constantes a saída também é,
+    # caso contrário o intervalo é subdividido para acompanhar a não linearidade da saída
+    axis = [universe[knots[0]]]
+    for a, b in zip(knots[:-1], knots[1:]):
+        constant = np.all(np.ptp(mfs[:, a:b + 1], axis = 1) == 0.0)
+        points = 1 if constant else subdivisions
+        axis.extend(np.linspace(universe[a], universe[b], points + 1)[1:])
+
+    return np.array(axis)
@@ -0,0 +1,114 @@
+import bisect
+import numpy as np
+
+# Base de regras indexada por termo, que avalia apenas as regras que podem ser ativadas pela leitura
+class RuleIndex:
+    def __init__(self, universes, breakpoints, rule_table, output_universes, output_mfs):
+
+        # Limites dos universos de entrada, usados para limitar as leituras como faz o skfuzzy
+        self._bounds = [(float(universe[0]), float(universe[-1])) for universe in universes]
+
+        # Pontos (a, b, c, d) das funções trapezoidais de cada termo, na ordem dos termos da variável
+        self._breakpoints = [[tuple(float(p) for p in abcd) for abcd in terms] for terms in breakpoints]
+
+        # Para cada entrada, divide o universo nos intervalos entre os pontos das funções e guarda
+        # os termos que podem ser não nulos em cada intervalo (no máximo dois nesta base de regras)
+        self._edges, self._candidates = [], []
+        for terms in self._breakpoints:
+            edges = sorted(set(p for abcd in terms for p in abcd))
+            candidates = []
+            for low, high in zip(edges[:-1], edges[1:]):
+                candidates.append([t for t, (a, b, c, d) in enumerate(terms) if a <= high and d >= low])
+            self._edges.append(edges)
+            self._candidates.append(candidates)
+
+        # Regras com o mesmo par de consequentes são agrupadas: a ativação do grupo é o máximo
+        # entre as suas regras, e o índice leva cada combinação de termos de entrada ao seu grupo
+        rule_table = np.asarray(rule_table)
+        pairs = sorted(set(tuple(row[3:]) for row in rule_table.tolist()))
+        group = {pair: g for g, pair in enumerate(pairs)}
+        self._pairs = pairs
+        self._index = {tuple(row[:3]): group[tuple(row[3:])] for row in rule_table.tolist()}
+
+        # Universos e funções de pertinência das saídas
+        self._output_universes = [np.asarray(universe, dtype = np.float64) for universe in output_universes]
+        self._output_mfs = [np.asarray(mfs, dtype = np.float64) for mfs in output_mfs]
+
+    @staticmethod
+    def _trapezoid(x, a, b, c, d):
+
+        # Pertinência de x na função trapezoidal (a, b, c, d)
+        if x < a or x > d:
+            return 0.0
+        if x < b:
+            return (x - a) / (b - a)
+        if x <= c:
+            return 1.0
+        return (d - x) / (d - c)
+
+    def _active_terms(self, i, value):
+
+        # Limita a leitura ao universo e localiza o intervalo que a contém
+        low, high = self._bounds[i]
+        value = min(max(value, low), high)
+        edges = self._edges[i]
+        interval = min(max(bisect.bisect_right(edges, value) - 1, 0), len(edges) - 2)
+
+        # Calcula a pertinência apenas dos termos candidatos, descartando os nulos
+        active = []
+        for t in self._candidates[i][interval]:
+            mu = self._trapezoid(value, *self._breakpoints[i][t])
+            if mu > 0.0:
+                active.append((t, mu))
+        return active
+
+    def _defuzz(self, o, cuts):
+
+        universe, mfs = self._output_universes[o], self._output_mfs[o]
+
+        # Amplia o universo com os pontos onde cada função de pertinência cruza o seu corte,
+        # como faz o skfuzzy, para que a área recortada seja calculada sem aproximação
+        new_values = []
+        for t, cut in cuts.items():
+            mf = mfs[t]
+            idx = np.flatnonzero(np.diff(mf >= cut))
+            new_values.append(universe[idx] + (cut - mf[idx]) * (universe[idx + 1] - universe[idx]) / (mf[idx + 1] - mf[idx]))
+        x = np.union1d(universe, np.concatenate(new_values))
+
+        # Função de saída: máximo entre as funções de pertinência recortadas pela ativação
+        y = np.zeros_like(x)
+        for t, cut in cuts.items():
+            np.maximum(y, np.minimum(cut, np.interp(x, universe, mfs[t])), out = y)
+
+        # Centroide, considerando a função linear entre cada par de pontos
+        x1, x2, y1, y2 = x[:-1], x[1:], y[:-1], y[1:]
+        area = np.sum((x2 - x1) * (y1 + y2)) / 2.0
+        moment = np.sum((x2 - x1) * (x1 * (2.0 * y1 + y2) + x2 * (y1 + 2.0 * y2))) / 6.0
+        return moment / area
+
+    def compute(self, temperature, pressure, humidity):
+
+        # Termos ativos de cada entrada
+        active = [self._active_terms(i, value) for i, value in enumerate((temperature, pressure, humidity))]
+
+        # Ativação de cada grupo de regras: mínimo entre os antecedentes, máximo entre as regras do grupo
+        strengths = {}
+        for t, mu_t in active[0]:
+            for p, mu_p in active[1]:
+                for h, mu_h in active[2]:
+                    g = self._index.get((t, p, h))
+                    if g is not None:
+                        strengths[g] = max(strengths.get(g, 0.0), min(mu_t, mu_p, mu_h))
+
+        if not strengths:
+            raise ValueError("No rule is activated by the given inputs")
+
+        # Ativação de cada termo de saída: máximo entre os grupos que o usam
+        outputs = []
+        for o in range(len(self._output_mfs)):
+            cuts = {}
+            for g, strength in strengths.items():
+                t = self._pairs[g][o]
+                cuts[t] = max(cuts.get(t, 0.0), strength)
+            outputs.append(self._defuzz(o, cuts))
+        return outputs
@@ -0,0 +1,179 @@
+import glob
+import os
+import time
+import numpy as np
+import iot
+
+# Registro de tamanho fixo de cada ciclo do controlador (41 bytes). As leituras do DHT11 são
+# inteiras e cabem em float32; as do BMP280 ficam em float64 para que as entradas do
+# controlador possam ser reconstruídas exatamente. Leituras ausentes são gravadas como NaN
+RECORD_DTYPE = np.dtype([
+    ('timestamp',          '<f8'),
+    ('dht11_humidity',     '<f4'),
+    ('dht11_temperature',  '<f4'),
+    ('bmp280_temperature', '<f8'),
+    ('bmp280_pressure',    '<f8'),
+    ('source',             'u1'),
+    ('heater',             '<f4'),
+    ('chiller',            '<f4'),
+])
+
+def _nan(value):
+    return np.nan if value is None else value
+
+# Grava os registros em arquivos .npy pré-alocados e rotativos, em lotes, para reduzir
+# a quantidade de escritas no cartão SD
+class TelemetryWriter:
+    def __init__(self, directory, records_per_file = 65536, batch_size = 64, max_files = 16, prefix = 'telemetry', sync = True,
+                 flush_interval = None):
+        self.directory = directory
+        self.records_per_file = records_per_file
+        self.max_files = max_files
+        self.prefix = prefix
+        self.sync = sync
+
+        # Lote em memória, gravado de uma só vez quando enche, em flush() ou, com flush_interval,
+        # no primeiro append depois de flush_interval segundos da última gravação, o que limita
+        # quantos ciclos uma queda de energia pode perder
+        self._batch = np.zeros(batch_size, dtype = RECORD_DTYPE)
+        self._pending = 0
+        self.flush_interval = flush_interval
+        self._flushed_at = time.monotonic()
+
+        # Arquivo atual; cada inicialização começa um arquivo novo depois dos existentes
+        os.makedirs(directory, exist_ok = True)
+        existing = _telemetry_files(directory, prefix)
+        self._index = _file_index(existing[-1]) + 1 if existing else 0
+        self._file = None
+        self._offset = 0
+        self._position = 0
+
+    def _open_next_file(self):
+
+        # Cria o próximo arquivo já com o tamanho final (cabeçalho .npy seguido de registros
+        # zerados), para que as escritas seguintes não precisem aumentar o arquivo
+        if self._file is not None:
+            self._file.close()
+            self._index += 1
+        path = os.path.join(self.directory, '{}-{:06d}.npy'.format(self.prefix, self._index))
+        self._file = open(path, 'w+b')
+        np.lib.format.write_array_header_1_0(self._file, {
+            'descr': np.lib.format.dtype_to_descr(RECORD_DTYPE),
+            'fortran_order': False,
+            'shape': (self.records_per_file,),
+        })
+        self._offset = self._file.tell()
+        self._file.write(bytes(self.records_per_file * RECORD_DTYPE.itemsize))
+        self._position = 0
+
+        # Remove os arquivos mais antigos além do limite
+        for old in _telemetry_files(self.directory, self.prefix)[:-self.max_files]:
+            os.remove(old)
+
+    def append(self, sample, heater, chiller):
+
+        # Adiciona o ciclo (um iot.RoomSample e as potências calculadas) ao lote
+        record = self._batch[self._pending]
+        record['timestamp'] = sample.timestamp
+        record['dht11_humidity'] = _nan(sample.dht11_humidity)
+        record['dht11_temperature'] = _nan(sample.dht11_temperature)
+        record['bmp280_temperature'] = _nan(sample.bmp280_temperature)
+        record['bmp280_pressure'] = _nan(sample.bmp280_pressure)
+        record['source'] = sample.source
+        record['heater'] = heater
+        record['chiller'] = chiller
+        self._pending += 1
+        if self._pending == len(self._batch) or (
+                self.flush_interval is not None and time.monotonic() - self._flushed_at >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+
+        # Grava o lote no arquivo atual, passando para o próximo arquivo quando ele enche
+        written = 0
+        while written < self._pending:
+            if self._file is None or self._position == self.records_per_file:
+                self._open_next_file()
+            count = min(self._pending - written, self.records_per_file - self._position)
+            self._file.seek(self._offset + self._position * RECORD_DTYPE.itemsize)
+            self._file.write(self._batch[written:written + count].tobytes())
+            self._position += count
+            written += count
+
+        if self._pending and self._file is not None:
+            self._file.flush()
+            if self.sync:
+                os.fsync(self._file.fileno())
+        self._pending = 0
+        self._flushed_at = time.monotonic()
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _telemetry_files(directory, prefix):
+    return sorted(glob.glob(os.path.join(directory, '{}-[0-9]*.npy'.format(prefix))), key = _file_index)
+
+def _file_index(path):
+    return int(os.path.basename(path).rsplit('-', 1)[1].split('.')[0])
+
+# Lê os arquivos de telemetria mapeados em memória, sem copiar os registros
+class TelemetryReader:
+    def __init__(self, directory, prefix = 'telemetry'):
+        self.paths = _telemetry_files(directory, prefix)
+
+    def files(self):
+
+        # Registros válidos de cada arquivo (a parte pré-alocada ainda não usada tem timestamp zero)
+        for path in self.paths:
+            records = np.load(path, mmap_mode = 'r')
+            count = np.searchsorted(records['timestamp'] == 0.0, True)
+            yield records[:count]
+
+    def records(self):
+
+        # Todos os registros em um único array (esta cópia só é feita aqui)
+        parts = list(self.files())
+        return np.concatenate(parts) if parts else np.zeros(0, dtype = RECORD_DTYPE)
+
+def inputs(records):
+
+    # Entradas do controlador em cada registro, escolhidas e arredondadas como em iot.room_inputs
+    temperature = np.where(records['source'] == iot.BMP280_SOURCE, records['bmp280_temperature'], records['dht11_temperature'])
+    return np.round(temperature, 2), np.round(records['bmp280_pressure'], 2), records['dht11_humidity'].astype(np.float64)
+
+def aggregate(records, interval = 3600.0):
+
+    # Médias por intervalo de tempo (em segundos): número de ciclos, entradas e potências
+    buckets, index = np.unique(np.floor(records['timestamp'] / interval), return_inverse = True)
+    counts = np.bincount(index, minlength = len(buckets))
+    result = {'start': buckets * interval, 'count': counts}
+    for name, values in zip(('temperature', 'pressure', 'humidity'), inputs(records)):
+        result[name] = np.bincount(index, values, len(buckets)) / counts
+    for name in ('heater', 'chiller'):
+        result[name] = np.bincount(index, records[name], len(buckets)) / counts
+    return result
+
+def replay(records, control):
+
+    # Recalcula as decisões com um ARTC a partir das leituras gravadas, usando a mesma escolha
+    # e arredondamento das entradas que iot.room_inputs; retorna as potências obtidas e uma
+    # máscara dos registros em que elas diferem das gravadas
+    heater = np.empty(len(records))
+    chiller = np.empty(len(records))
+    for i, record in enumerate(records.tolist()):
+        sample = iot.RoomSample(*(record[:6]))
+        try:
+            heater[i], chiller[i] = control.compute_potency(*iot.room_inputs(sample))
+        except ValueError:
+            heater[i] = chiller[i] = np.nan
+    differs = (heater.astype(np.float32) != records['heater']) | (chiller.astype(np.float32) != records['chiller'])
+    return heater, chiller, differs
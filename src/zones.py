@@ -0,0 +1,164 @@
+import concurrent.futures
+import time
+import artc
+import iot
+
+# Controlador compartilhado pelos processos do pool, criado uma vez em cada processo
+_worker_control = None
+
+def _init_worker(control):
+    global _worker_control
+    _worker_control = control
+
+def _compute_chunk(readings, control = None):
+
+    # Calcula as potências de um grupo de zonas; uma leitura que falha (por exemplo, uma que não
+    # ativa nenhuma regra) gera a exceção no lugar do resultado, sem interromper as demais zonas
+    control = control if control is not None else _worker_control
+    results = []
+    for reading in readings:
+        try:
+            results.append(control.compute_potency(*reading))
+        except Exception as error:
+            results.append(error)
+    return results
+
+# Estado de uma sala: sensores, última leitura e últimas potências calculadas
+class Zone:
+    def __init__(self, name, dht11, bmp280, poll = True, dht11_interval = 2.0, bmp280_interval = 1.0, dht11_max_age = 60.0,
+                 humidity_max_age = 600.0, bmp280_max_age = 60.0):
+        self.name = name
+        self.dht11 = dht11
+        self.bmp280 = bmp280
+
+        # Idade máxima das leituras, como em iot.room_sample
+        self.dht11_max_age = dht11_max_age
+        self.humidity_max_age = humidity_max_age
+        self.bmp280_max_age = bmp280_max_age
+
+        # Com poll os sensores são lidos em segundo plano (iot.room_acquisition);
+        # sem ele são lidos diretamente a cada ciclo
+        self.acquisition = iot.room_acquisition(dht11, bmp280, dht11_interval, bmp280_interval) if poll else None
+        self.poll_interval = max(dht11_interval, bmp280_interval)
+        self._started = None
+
+        self.timestamp = None
+        self.reading = None
+        self.heater_potency = None
+        self.chiller_potency = None
+        self.error = None
+
+    def start(self):
+        if self.acquisition is not None:
+            self.acquisition.start()
+            self._started = time.monotonic()
+
+    def stop(self):
+        if self.acquisition is not None:
+            self.acquisition.stop()
+
+    def ready(self):
+
+        # A zona só participa do ciclo quando todos os seus sensores já têm leitura
+        if self.acquisition is None or self.acquisition.wait(0):
+            return True
+
+        # Passado o intervalo de leitura sem nenhuma amostra, a zona fica com erro em vez de
+        # parecer saudável enquanto é ignorada
+        if self._started is not None and time.monotonic() - self._started > self.poll_interval:
+            missing = [name for name in ('dht11', 'bmp280') if self.acquisition.latest(name) is None]
+            self.error = ValueError("No sample yet from {}".format(', '.join(missing)))
+        return False
+
+    def read(self):
+        if self.acquisition is not None:
+            return iot.read_room(self.acquisition, self.dht11_max_age, self.humidity_max_age, self.bmp280_max_age)
+        return iot.read_sensors(self.dht11, self.bmp280)
+
+# Controlador de várias salas: todas usam a mesma definição de regras e cada uma guarda o seu
+# próprio estado; os cálculos de cada ciclo são distribuídos em um pool de threads ou de processos.
+# Com threads há um único ARTC, somente leitura, compartilhado por todas as zonas; com processos
+# cada processo do pool recebe a sua própria cópia do ARTC (serializada uma vez, na criação do
+# processo), então a memória do controlador se repete a cada worker
+class ZoneController:
+    def __init__(self, control = None, executor = 'thread', workers = None, chunk_size = 64):
+
+        # O controlador compartilhado precisa do modo esparso ou compilado, em que compute_potency
+        # não altera o estado do ARTC
+        self.control = control if control is not None else artc.ARTC(sparse = True)
+        if not self.control.is_reentrant():
+            raise ValueError("ZoneController needs an ARTC in sparse or compiled mode")
+        self.chunk_size = chunk_size
+        self.zones = {}
+
+        if executor == 'thread':
+            self._executor = concurrent.futures.ThreadPoolExecutor(workers)
+            self._compute = lambda readings: _compute_chunk(readings, self.control)
+        elif executor == 'process':
+            self._executor = concurrent.futures.ProcessPoolExecutor(workers, initializer = _init_worker, initargs = (self.control,))
+            self._compute = _compute_chunk
+        else:
+            raise ValueError("executor must be 'thread' or 'process'")
+
+        # Estatísticas dos ciclos
+        self.ticks = 0
+        self.last_tick_duration = None
+
+    def add_zone(self, name, dht11, bmp280, **options):
+        if name in self.zones:
+            raise ValueError("Zone '{}' already exists".format(name))
+        zone = Zone(name, dht11, bmp280, **options)
+        zone.start()
+        self.zones[name] = zone
+        return zone
+
+    def remove_zone(self, name):
+        self.zones.pop(name).stop()
+
+    def configure(self, config):
+
+        # Ajusta as zonas à configuração {nome: {'dht11': ..., 'bmp280': ..., opções de Zone}}:
+        # remove as que saíram e adiciona as novas, mantendo o estado das que continuam
+        for name in [name for name in self.zones if name not in config]:
+            self.remove_zone(name)
+        for name, options in config.items():
+            if name not in self.zones:
+                self.add_zone(name, **options)
+
+    def tick(self):
+
+        # Lê as zonas prontas; uma zona cuja leitura falha (o DHT11 sem umidade, por exemplo)
+        # fica com o erro e não participa deste ciclo
+        started = time.perf_counter()
+        zones, readings = [], []
+        for zone in self.zones.values():
+            if not zone.ready():
+                continue
+            try:
+                readings.append(zone.read())
+            except Exception as error:
+                zone.error = error
+                continue
+            zones.append(zone)
+
+        # Divide os cálculos em grupos para o pool
+        chunks = [readings[i:i + self.chunk_size] for i in range(0, len(readings), self.chunk_size)]
+        results = [result for chunk in self._executor.map(self._compute, [[r for _, r, _ in c] for c in chunks]) for result in chunk]
+
+        # Guarda o resultado no estado de cada zona
+        for zone, (timestamp, reading, _), result in zip(zones, readings, results):
+            zone.timestamp, zone.reading = timestamp, reading
+            if isinstance(result, Exception):
+                zone.error = result
+            else:
+                zone.error = None
+                zone.heater_potency, zone.chiller_potency = result
+
+        self.ticks += 1
+        self.last_tick_duration = time.perf_counter() - started
+        return len(zones)
+
+    def shutdown(self):
+        for zone in self.zones.values():
+            zone.stop()
+        self._executor.shutdown()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os módulos em src/ importam uns aos outros diretamente (import iot, import artc), como quando app.py é executado
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
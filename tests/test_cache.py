@@ -0,0 +1,19 @@
+from cache import QuantizedCache
+
+def test_quantize_uses_one_step_per_input():
+    cache = QuantizedCache(4, (0.5, 1.0, 1.0))
+    assert cache.quantize((21.3, 1013.4, 49.6)) == (43, 1013, 50)
+    assert cache.quantize((21.4, 1013.1, 50.4)) == cache.quantize((21.3, 1013.4, 49.6))
+
+def test_evicts_least_recently_used():
+    cache = QuantizedCache(2, 1.0)
+    cache.put((1,), 'a')
+    cache.put((2,), 'b')
+    assert cache.get((1,)) == 'a'
+    cache.put((3,), 'c')
+
+    # (2,) era o menos usado recentemente
+    assert cache.get((2,)) is None
+    assert cache.get((1,)) == 'a'
+    assert cache.get((3,)) == 'c'
+    assert cache.info() == {'size': 2, 'entries': 2, 'hits': 3, 'misses': 1, 'evictions': 1}
@@ -0,0 +1,76 @@
+import control_loop
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class RecordingControl:
+
+    # Controlador falso que só registra as leituras calculadas
+    def __init__(self):
+        self.computed = []
+
+    def compute_simulation(self, temperature, pressure, humidity):
+        self.computed.append((temperature, pressure, humidity))
+        self.heater_potency, self.chiller_potency = 0.0, 0.0
+
+def make_loop(readings, **options):
+    clock = FakeClock()
+    control = RecordingControl()
+    updates = []
+    loop = control_loop.ControlLoop(control, lambda: (0.0, readings[-1], None),
+                                    lambda reading, control, sample: updates.append(reading),
+                                    clock = clock, **options)
+    return loop, clock, control, updates
+
+def test_skips_readings_inside_deadband():
+    readings = [(20.0, 1000.0, 50.0)]
+    loop, clock, control, updates = make_loop(readings, deadband = (0.5, 1.0, 1.0), max_staleness = 300.0)
+    loop.step()
+    readings.append((20.3, 1000.5, 50.5))
+    loop.step()
+    assert len(control.computed) == 1
+    assert loop.stats()['skipped'] == 1
+
+    readings.append((21.0, 1000.5, 50.5))
+    loop.step()
+    assert control.computed[-1] == (21.0, 1000.5, 50.5)
+    assert updates == control.computed
+
+def test_recomputes_after_max_staleness():
+    readings = [(20.0, 1000.0, 50.0)]
+    loop, clock, control, _ = make_loop(readings, max_staleness = 300.0)
+    loop.step()
+    clock.now = 299.0
+    loop.step()
+    assert len(control.computed) == 1
+    clock.now = 300.0
+    loop.step()
+    assert len(control.computed) == 2
+
+def test_interval_backs_off_while_stable():
+    readings = [(20.0, 1000.0, 50.0)]
+    loop, _, _, _ = make_loop(readings, min_interval = 1.0, max_interval = 4.0, backoff = 2.0)
+    intervals = []
+    for _ in range(4):
+        loop.step()
+        intervals.append(loop.interval)
+    assert intervals == [1.0, 2.0, 4.0, 4.0]
+
+    readings.append((25.0, 1000.0, 50.0))
+    loop.step()
+    assert loop.interval == 1.0
+
+def test_read_errors_are_counted():
+    errors = []
+
+    def read():
+        raise ValueError("stale")
+
+    loop = control_loop.ControlLoop(RecordingControl(), read, on_error = errors.append, clock = FakeClock())
+    loop.step()
+    assert loop.stats()['read_errors'] == 1
+    assert len(errors) == 1
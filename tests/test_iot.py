@@ -0,0 +1,65 @@
+import time
+import pytest
+import iot
+
+class FixedAcquisition:
+
+    # Aquisição com leituras fixas, para controlar a idade de cada amostra
+    def __init__(self, dht11, bmp280):
+        self._samples = {'dht11': dht11, 'bmp280': bmp280}
+
+    def latest(self, name):
+        return self._samples[name]
+
+def test_ring_buffer_keeps_latest_samples():
+    buffer = iot.RingBuffer(3)
+    assert buffer.latest() is None
+    for i in range(5):
+        buffer.append(iot.Sample(float(i), i))
+    assert [sample.value for sample in buffer.samples()] == [2, 3, 4]
+    assert buffer.latest().value == 4
+
+def test_room_sample_uses_dht11_temperature_when_fresh():
+    now = time.time()
+    acquisition = FixedAcquisition(iot.Sample(now - 1.0, (40.0, 21.0)), iot.Sample(now - 2.0, (22.5, 1000.0)))
+    sample = iot.room_sample(acquisition)
+    assert sample.source == iot.DHT11_SOURCE
+    assert sample.timestamp == now - 2.0
+    assert iot.room_inputs(sample) == (21.0, 1000.0, 40.0)
+
+def test_room_sample_falls_back_to_bmp280_temperature():
+    now = time.time()
+    acquisition = FixedAcquisition(iot.Sample(now - 120.0, (40.0, 21.0)), iot.Sample(now - 2.0, (22.5, 1000.0)))
+    sample = iot.room_sample(acquisition, dht11_max_age = 60.0)
+    assert sample.source == iot.BMP280_SOURCE
+    assert sample.timestamp == now - 2.0
+    assert iot.room_inputs(sample) == (22.5, 1000.0, 40.0)
+
+def test_room_sample_rejects_old_humidity_and_pressure():
+    now = time.time()
+    with pytest.raises(ValueError):
+        iot.room_sample(FixedAcquisition(iot.Sample(now - 700.0, (40.0, 21.0)), iot.Sample(now, (22.5, 1000.0))))
+    with pytest.raises(ValueError):
+        iot.room_sample(FixedAcquisition(iot.Sample(now, (40.0, 21.0)), iot.Sample(now - 120.0, (22.5, 1000.0))))
+
+def test_acquisition_drops_failed_reads():
+    dht11 = iot.FakeDHT11Monitor(humidity = 45.2, temperature = 20.7, failure_rate = 0.5, seed = 1)
+    bmp280 = iot.FakeBMP280Monitor(temperature = 21.0, pressure = 1010.0, noise = 0.0, seed = 1)
+    acquisition = iot.room_acquisition(dht11, bmp280, dht11_interval = 0.01, bmp280_interval = 0.01)
+    acquisition.start()
+    try:
+        assert acquisition.wait(5.0)
+        time.sleep(0.2)
+    finally:
+        acquisition.stop(1.0)
+
+    # As leituras que falharam contam como erro e não entram no histórico
+    assert acquisition.errors('dht11') > 0
+    assert all(sample.value == (45.0, 21.0) for sample in acquisition.history('dht11'))
+    sample = iot.room_sample(acquisition)
+    assert iot.room_inputs(sample) == (21.0, 1010.0, 45.0)
+
+def test_read_sensors_rejects_failed_dht11_read():
+    dht11 = iot.FakeDHT11Monitor(failure_rate = 1.0, seed = 0)
+    with pytest.raises(ValueError):
+        iot.read_sensors(dht11, iot.FakeBMP280Monitor(seed = 0))
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+import artc
+import iot
+import telemetry
+
+@pytest.fixture(scope = 'module')
+def control():
+    return artc.ARTC(sparse = True)
+
+def room_cycles(control, count):
+
+    # Ciclos com leituras dos sensores falsos e as potências calculadas para elas
+    dht11 = iot.FakeDHT11Monitor(humidity = 40.0, temperature = 18.0, seed = 0)
+    bmp280 = iot.FakeBMP280Monitor(temperature = 18.0, pressure = 950.0, noise = 0.5, seed = 0)
+    cycles = []
+    for i in range(count):
+        dht11.temperature = bmp280.temperature = 10.0 + 2.0 * i
+        _, inputs, sample = iot.read_sensors(dht11, bmp280)
+        cycles.append((sample, control.compute_potency(*inputs)))
+    return cycles
+
+def test_write_rotate_read_replay(tmp_path, control):
+    cycles = room_cycles(control, 10)
+    with telemetry.TelemetryWriter(str(tmp_path), records_per_file = 4, batch_size = 3, max_files = 2, sync = False) as log:
+        for sample, (heater, chiller) in cycles:
+            log.append(sample, heater, chiller)
+
+    # 10 registros em arquivos de 4: o primeiro arquivo foi removido pela rotação
+    reader = telemetry.TelemetryReader(str(tmp_path))
+    assert len(reader.paths) == 2
+    records = reader.records()
+    assert len(records) == 6
+    assert records['timestamp'].tolist() == [sample.timestamp for sample, _ in cycles[4:]]
+    assert records['bmp280_pressure'].tolist() == [sample.bmp280_pressure for sample, _ in cycles[4:]]
+
+    # As entradas reconstruídas e as decisões recalculadas são as mesmas do ciclo original
+    temperature, pressure, humidity = telemetry.inputs(records)
+    assert list(zip(temperature, pressure, humidity)) == [iot.room_inputs(sample) for sample, _ in cycles[4:]]
+    heater, chiller, differs = telemetry.replay(records, control)
+    assert not differs.any()
+    assert heater.tolist() == [potency[0] for _, potency in cycles[4:]]
+
+def test_new_writer_starts_a_new_file(tmp_path, control):
+    sample, (heater, chiller) = room_cycles(control, 1)[0]
+    for _ in range(2):
+        with telemetry.TelemetryWriter(str(tmp_path), records_per_file = 4, sync = False) as log:
+            log.append(sample, heater, chiller)
+    parts = list(telemetry.TelemetryReader(str(tmp_path)).files())
+    assert [len(part) for part in parts] == [1, 1]
+    assert np.all(parts[0] == parts[1])